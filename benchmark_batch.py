@@ -0,0 +1,50 @@
+import os
+import sys
+import threading
+import time
+
+"""
+Renders a batch of cards with pbatch.render_batch() and measures the time per card
+Checks that every record comes back exactly once and that the batch returns once the last result has been yielded, exiting with an error if it doesn't finish within the deadline
+Usage: python benchmark_batch.py [records [processes]]
+"""
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pwidget"))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pgui
+import pbatch
+
+DEADLINE = 120
+
+def build_card(gc, record):
+	panel = pgui.PPanel(pgui.VERTICAL_ORIENTATION)
+	panel.add_component(pgui.PLabel(gc, "card %d" % record))
+	panel.add_component(pgui.PButton(gc, "open %d" % record))
+	return panel
+
+def watchdog():
+	time.sleep(DEADLINE)
+	sys.stderr.write("render_batch didn't finish within %d seconds\n" % DEADLINE)
+	os._exit(1)
+
+def main():
+	records = 200
+	processes = None
+	if len(sys.argv) > 1:
+		records = int(sys.argv[1])
+	if len(sys.argv) > 2:
+		processes = int(sys.argv[2])
+	timer = threading.Thread(target = watchdog)
+	timer.daemon = True
+	timer.start()
+
+	start = time.time()
+	indices = [index for index, image in pbatch.render_batch(build_card, range(records), 200, 40, "fonts/Black Font.png", 10, processes = processes)]
+	finished = time.time()
+	if sorted(indices) != list(range(records)):
+		sys.exit("render_batch returned %d of %d records" % (len(set(indices)), records))
+	print("%d records in %.2f ms, %.3f ms per record" % (records, (finished - start) * 1000, (finished - start) * 1000 / records))
+
+if __name__ == "__main__":
+	main()
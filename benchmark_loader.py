@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+"""
+Compares building a large screen imperatively with add_component() against loading the same screen from a definition with ploader, without (cold) and with (warm) its cache
+Each run is made in a fresh interpreter so that nothing is cached in memory between runs
+Before timing, checks that the loaded screen is laid out exactly like the one built imperatively, where each row's PPanel grows after it has been added to the PGridPanel
+Usage: python benchmark_loader.py [runs [rows]]
+"""
+
+def make_definition(rows):
+	children = []
+	for i in range(rows):
+		children.append({"type": "PLabel", "value": "field %d" % i, "row": i, "column": 0})
+		children.append({"type": "PPanel", "orientation": "horizontal", "row": i, "column": 1, "children": [
+			{"type": "PHorizontalStrut", "width": 10},
+			{"type": "PTextBox", "max_width": 100},
+			{"type": "PCheckBox", "label": "enabled"},
+			{"type": "PButton", "value": "apply %d" % i, "action": "apply"}
+		]})
+	grid = {"type": "PGridPanel", "rows": ["auto"] * rows, "columns": ["auto", "auto"], "children": children}
+	return {"type": "PScrollPanel", "max_width": 480, "max_height": 480, "children": [grid]}
+
+def build_imperative(pgui, gc, rows, action):
+	scroll = pgui.PScrollPanel(gc, 480, 480, pgui.VERTICAL_ORIENTATION)
+	grid = pgui.PGridPanel([pgui.GRID_AUTO] * rows, [pgui.GRID_AUTO, pgui.GRID_AUTO])
+	for i in range(rows):
+		grid.add_component(pgui.PLabel(gc, "field %d" % i), i, 0)
+		panel = pgui.PPanel(pgui.HORIZONTAL_ORIENTATION)
+		grid.add_component(panel, i, 1)
+		panel.add_component(pgui.PHorizontalStrut(10))
+		panel.add_component(pgui.PTextBox(gc, 100))
+		panel.add_component(pgui.PCheckBox(gc, "enabled"))
+		button = pgui.PButton(gc, "apply %d" % i)
+		button.add_action(action)
+		panel.add_component(button)
+	scroll.add_component(grid)
+	return scroll
+
+def check_layout(filename, rows):
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pwidget"))
+	import pgui
+	import ploader
+
+	window = pgui.PWindow(500, 500)
+	gc = pgui.PGraphicsContext(pgui.PFont("fonts/Black Font.png", 10))
+	imperative = [comp.get_rect() for comp in ploader.walk(build_imperative(pgui, gc, rows, lambda button: None))]
+	loaded = [comp.get_rect() for comp in ploader.walk(ploader.PLoader(gc, {"apply": lambda button: None}).load_definition(json.load(open(filename))))]
+	if imperative != loaded:
+		sys.exit("loaded layout differs from the imperative layout")
+	print("layouts match")
+
+def run_once(mode, filename, rows):
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pwidget"))
+	import pgui
+	import ploader
+
+	window = pgui.PWindow(500, 500)
+	font = pgui.PFont("fonts/Black Font.png", 10)
+	gc = pgui.PGraphicsContext(font)
+	start = time.time()
+	if mode == "imperative":
+		root = build_imperative(pgui, gc, rows, lambda button: None)
+	else:
+		root = ploader.load(gc, filename, {"apply": lambda button: None})
+	built = time.time()
+	window.add_component(root)
+	window.step()
+	presented = time.time()
+	print("%f %f" % (built - start, presented - built))
+
+def main():
+	runs = 5
+	rows = 2000
+	if len(sys.argv) > 1:
+		runs = int(sys.argv[1])
+	if len(sys.argv) > 2:
+		rows = int(sys.argv[2])
+	directory = tempfile.mkdtemp()
+	filename = os.path.join(directory, "screen.json")
+	with open(filename, "w") as definitionfile:
+		json.dump(make_definition(rows), definitionfile)
+	check = os.path.join(directory, "check.json")
+	with open(check, "w") as definitionfile:
+		json.dump(make_definition(50), definitionfile)
+	subprocess.check_call([sys.executable, __file__, "--check", check, "50"])
+
+	for mode in ["imperative", "cold", "warm"]:
+		totals = [0.0, 0.0]
+		for i in range(runs):
+			if mode == "cold" and os.path.exists(filename + ".cache"):
+				os.remove(filename + ".cache")
+			output = subprocess.check_output([sys.executable, __file__, "--once", mode, filename, str(rows)])
+			for j, value in enumerate(output.split()[-2:]):
+				totals[j] += float(value)
+		print("%-10s build %8.2f ms  first frame %8.2f ms" % (mode, totals[0] * 1000 / runs, totals[1] * 1000 / runs))
+
+if __name__ == "__main__":
+	if "--check" in sys.argv:
+		index = sys.argv.index("--check")
+		check_layout(sys.argv[index + 1], int(sys.argv[index + 2]))
+	elif "--once" in sys.argv:
+		index = sys.argv.index("--once")
+		run_once(sys.argv[index + 1], sys.argv[index + 2], int(sys.argv[index + 3]))
+	else:
+		main()
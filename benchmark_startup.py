@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import time
+
+"""
+Measures the time from importing pgui to the first presented frame
+Each run is made in a fresh interpreter so that the imports are not cached
+Usage: python benchmark_startup.py [runs]
+"""
+
+def run_once():
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pwidget"))
+	start = time.time()
+	import pgui
+	imported = time.time()
+
+	window = pgui.PWindow(500, 500)
+	opened = time.time()
+
+	font = pgui.PFont('fonts/Black Font.png', 10)
+	gc = pgui.PGraphicsContext(font)
+	window.add_component(pgui.PLabel(gc, "hello world!"))
+	loaded = time.time()
+
+	window.step()
+	presented = time.time()
+
+	print("%f %f %f %f" % (imported - start, opened - imported, loaded - opened, presented - loaded))
+
+def main():
+	runs = 10
+	if len(sys.argv) > 1:
+		runs = int(sys.argv[1])
+	totals = [0.0, 0.0, 0.0, 0.0]
+	for i in range(runs):
+		output = subprocess.check_output([sys.executable, __file__, "--once"])
+		for j, value in enumerate(output.split()[-4:]):
+			totals[j] += float(value)
+	names = ["import", "open window", "load font", "first frame"]
+	for name, total in zip(names, totals):
+		print("%-12s %8.2f ms" % (name, total * 1000 / runs))
+	print("%-12s %8.2f ms" % ("total", sum(totals) * 1000 / runs))
+
+if __name__ == "__main__":
+	if "--once" in sys.argv:
+		run_once()
+	else:
+		main()
@@ -1,12 +1,33 @@
 import pygame
 import pygame.locals
 
+try:
+	TEXT_TYPES = (str, unicode)
+except NameError:
+	TEXT_TYPES = (str,)
+
+"""
+Returns value unchanged if it is already a byte or unicode string, otherwise its str()
+Unicode strings are kept as they are so that characters outside ASCII can be drawn
+"""
+def totext(value):
+	if isinstance(value, TEXT_TYPES):
+		return value
+	return str(value)
+
 """
 Draws text on the given surface at the given x and y coordinates up to maxwidth pixels
+Each character is blitted from the area of the font's atlas given by the font's codepoint table
 """
 def pdrawstring(surface, font, x, y, text, maxwidth = 10000):
-	for i, char in enumerate(str(text)):
-		if x + (i * font.get_fontsize()) + (i * min(max(1, font.get_fontsize() / 10), 10)) + font.get_fontsize() < maxwidth:
-			surface.blit(font.get_char(char), (x + (i * font.get_fontsize()) + (i * min(max(1, font.get_fontsize() / 10), 10)), y))
+	atlas = font.get_atlas()
+	table = font.get_table()
+	fallback = font.get_fallback()
+	advance = font.get_advance()
+	fontsize = font.get_fontsize()
+	for i, char in enumerate(totext(text)):
+		charx = x + (i * advance)
+		if charx + fontsize < maxwidth:
+			surface.blit(atlas, (charx, y), table.get(ord(char), fallback))
 		else:
-			break
\ No newline at end of file
+			break
@@ -0,0 +1,80 @@
+import json
+import math
+import os
+
+import pygame
+
+"""
+Packs the square glyphs of one or more font sheets into a single atlas surface and maps each character's codepoint to the area of its glyph in the atlas
+sources is a list of (filename, characters) pairs, where characters is either a string listing the characters of the tiles in filename from left to right and top to bottom, or a list of such strings, one for each row of tiles
+aliases maps extra characters onto the glyph of an existing character
+Characters without a glyph of their own use the glyph of the same letter in the other case if there is one, and the fallback glyph otherwise
+Uses the standard pink colorkey
+"""
+class PFontAtlas:
+	def __init__(self, sources, tilesize, aliases = None, fallback = "?", colorkey = (255, 0, 255)):
+		glyphs = []
+		for filename, characters in sources:
+			image = pygame.image.load(filename).convert()
+			if isinstance(characters, list):
+				for row, rowcharacters in enumerate(characters):
+					for column, char in enumerate(rowcharacters):
+						glyphs.append((char, image, pygame.Rect(column * tilesize, row * tilesize, tilesize, tilesize)))
+			else:
+				columns = image.get_width() // tilesize
+				for i, char in enumerate(characters):
+					glyphs.append((char, image, pygame.Rect((i % columns) * tilesize, (i // columns) * tilesize, tilesize, tilesize)))
+
+		columns = max(int(math.ceil(math.sqrt(len(glyphs)))), 1)
+		rows = max((len(glyphs) + columns - 1) // columns, 1)
+		self.tilesize = tilesize
+		self.atlas = pygame.Surface((columns * tilesize, rows * tilesize)).convert()
+		self.atlas.fill(colorkey)
+		self.atlas.set_colorkey(colorkey)
+		self.table = {}
+		for i, (char, image, area) in enumerate(glyphs):
+			rect = pygame.Rect((i % columns) * tilesize, (i // columns) * tilesize, tilesize, tilesize)
+			self.atlas.blit(image, rect.topleft, area)
+			self.table.setdefault(ord(char), rect)
+
+		if aliases != None:
+			for alias, char in aliases.items():
+				if ord(char) in self.table:
+					self.table[ord(alias)] = self.table[ord(char)]
+		for char, image, area in glyphs:
+			for other in (char.lower(), char.upper()):
+				if len(other) == 1 and ord(other) not in self.table:
+					self.table[ord(other)] = self.table[ord(char)]
+
+		self.fallback = self.table.get(ord(fallback), pygame.Rect(0, 0, 0, 0))
+
+	def get_atlas(self):
+		return self.atlas
+
+	def get_table(self):
+		return self.table
+
+	def get_fallback(self):
+		return self.fallback
+
+	def get_tilesize(self):
+		return self.tilesize
+
+	def get_rect(self, char):
+		return self.table.get(ord(char), self.fallback)
+
+
+"""
+Builds a PFontAtlas from a JSON manifest of the form:
+{"tilesize": 10, "sheets": [{"file": "Black Font.png", "characters": "abc..."}], "aliases": {"_": " "}, "fallback": "?"}
+The characters of a sheet may also be given as a list of strings, one for each row of tiles
+Sheet filenames are relative to the directory of the manifest
+"""
+def load_manifest(filename):
+	with open(filename) as manifestfile:
+		manifest = json.load(manifestfile)
+	directory = os.path.dirname(filename)
+	sources = []
+	for sheet in manifest["sheets"]:
+		sources.append((os.path.join(directory, sheet["file"]), sheet["characters"]))
+	return PFontAtlas(sources, manifest["tilesize"], manifest.get("aliases"), manifest.get("fallback", "?"))
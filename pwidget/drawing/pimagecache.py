@@ -0,0 +1,102 @@
+import collections
+import threading
+
+try:
+	import Queue as queue
+except ImportError:
+	import queue
+
+import pygame
+
+"""
+Decodes image files in a background thread and keeps a bounded cache of scaled copies of them, converted to the display format
+At most max_images decoded images and max_variants scaled copies are kept, discarding the least recently used when the limits are exceeded
+request(filename) starts decoding a file. get(filename, width, height) returns its scaled copy, or None if the file is still being decoded or couldn't be decoded
+get() must be called from the thread that owns the display, as converting to the display format isn't thread safe
+"""
+class PImageCache:
+	def __init__(self, max_images = 64, max_variants = 256):
+		self.max_images = max_images
+		self.max_variants = max_variants
+		self.requests = queue.Queue()
+		self.lock = threading.Lock()
+		self.decoded = collections.OrderedDict()
+		self.pending = set()
+		self.variants = collections.OrderedDict()
+		self.thread = None
+
+	def request(self, filename):
+		with self.lock:
+			if filename in self.decoded or filename in self.pending:
+				return
+			self.pending.add(filename)
+			if self.thread == None:
+				self.thread = threading.Thread(target = self.decode_images)
+				self.thread.daemon = True
+				self.thread.start()
+		self.requests.put(filename)
+
+	def decode_images(self):
+		while True:
+			filename = self.requests.get()
+			try:
+				image = pygame.image.load(filename)
+			except (pygame.error, IOError):
+				image = None
+			with self.lock:
+				self.pending.discard(filename)
+				self.decoded[filename] = image
+				while len(self.decoded) > self.max_images:
+					self.decoded.popitem(last = False)
+
+	def get(self, filename, width, height):
+		key = (filename, width, height)
+		variant = self.variants.pop(key, None)
+		if variant != None:
+			self.variants[key] = variant
+			return variant
+
+		with self.lock:
+			if filename not in self.decoded:
+				image = None
+				missing = True
+			else:
+				image = self.decoded.pop(filename)
+				self.decoded[filename] = image
+				missing = False
+		if missing:
+			self.request(filename)
+			return None
+		if image == None:
+			return None
+
+		variant = image
+		if image.get_size() != (width, height):
+			if image.get_bitsize() in (24, 32):
+				variant = pygame.transform.smoothscale(image, (width, height))
+			else:
+				variant = pygame.transform.scale(image, (width, height))
+		if image.get_flags() & pygame.SRCALPHA:
+			variant = variant.convert_alpha()
+		else:
+			variant = variant.convert()
+		self.variants[key] = variant
+		while len(self.variants) > self.max_variants:
+			self.variants.popitem(last = False)
+		return variant
+
+	def is_failed(self, filename):
+		with self.lock:
+			return filename in self.decoded and self.decoded[filename] == None
+
+
+default_cache = None
+
+"""
+Returns the PImageCache shared by every PImage that isn't given a cache of its own
+"""
+def get_default_cache():
+	global default_cache
+	if default_cache == None:
+		default_cache = PImageCache()
+	return default_cache
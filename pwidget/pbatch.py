@@ -0,0 +1,58 @@
+import os
+import multiprocessing
+import signal
+
+import pygame
+
+import pgui
+
+worker = {}
+
+"""
+Sets up a worker process: a headless PWindow used as the render target and a PGraphicsContext whose PFont is loaded once per worker
+SDL turns SIGTERM into a QUIT event when the display is initialised, so the default handler is restored to let the pool terminate its workers
+"""
+def init_worker(builder, width, height, fontfile, fontsize):
+	os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+	worker["builder"] = builder
+	worker["window"] = pgui.PWindow(width, height)
+	signal.signal(signal.SIGTERM, signal.SIG_DFL)
+	worker["gc"] = pgui.PGraphicsContext(pgui.PFont(fontfile, fontsize))
+
+"""
+Builds and renders the PComponent tree for a single record inside a worker process
+Returns (index, filename) if output is a filename pattern, otherwise (index, RGB string of the rendered image)
+"""
+def render_record(task):
+	index, record, output = task
+	window = worker["window"]
+	window.reset_state()
+	window.add_component(worker["builder"](worker["gc"], record))
+	window.render(window.screen)
+	if output == None:
+		return index, pygame.image.tostring(window.screen, "RGB")
+	filename = output % index
+	pygame.image.save(window.screen, filename)
+	return index, filename
+
+"""
+Renders one PComponent tree per record off-screen across a pool of processes, yielding (index, result) pairs as soon as each one finishes
+builder is a module-level function taking a PGraphicsContext and a record and returning the PComponent to render
+output is a filename pattern such as 'card_%d.png' that is formatted with the index of the record. If it is None, the raw RGB string of each image is yielded instead
+Results are yielded in the order they finish, not in the order of records
+The workers are shut down once every result has been yielded, or terminated if rendering fails or the generator is closed early
+"""
+def render_batch(builder, records, width, height, fontfile, fontsize, output = None, processes = None, chunksize = 1):
+	pool = multiprocessing.Pool(processes, init_worker, (builder, width, height, fontfile, fontsize))
+	finished = False
+	try:
+		tasks = ((index, record, output) for index, record in enumerate(records))
+		for result in pool.imap_unordered(render_record, tasks, chunksize):
+			yield result
+		finished = True
+	finally:
+		if finished:
+			pool.close()
+		else:
+			pool.terminate()
+		pool.join()
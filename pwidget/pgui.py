@@ -1,13 +1,24 @@
 import pygame
-import pygame.locals
 import sys
+import collections
+import heapq
+import mmap
+import os
+import time
 
 from drawing import pdrawstring
-from drawing import ptilesheet
 
 VERTICAL_ORIENTATION = 0
 HORIZONTAL_ORIENTATION = 1
 
+GRID_AUTO = "auto"
+GRID_FIXED = 0
+GRID_FIT = 1
+GRID_PROPORTIONAL = 2
+
+LOG_INDEX_STRIDE = 64
+LOG_INDEX_CHUNK = 1 << 20
+
 """
 Base class for widgets
 """
@@ -30,6 +41,9 @@ class PComponent:
 	def mouse_up(self, x, y, window):
 		pass
 
+	def mouse_motion(self, x, y, window):
+		pass
+
 	def key_down(self, key, window):
 		pass
 
@@ -42,9 +56,32 @@ class PComponent:
 	def adjust_parent(self):
 		pass
 
+	def adjust_child(self, child):
+		self.fit_components()
+		self.adjust_children()
+		self.adjust_parent()
+
+	def fit_components(self):
+		pass
+
 	def contains_point(self, x, y):
 		return (x >= self.x and x <= self.x + self.width and y >= self.y and y <= self.y + self.height)
 
+	def get_component_at(self, x, y):
+		for comp in self.components:
+			if comp.contains_point(x, y):
+				return comp.get_component_at(x, y)
+		return self
+
+	def get_leaves_in(self, rect):
+		if len(self.components) == 0:
+			return [self]
+		leaves = []
+		for comp in self.components:
+			if comp.get_rect().colliderect(rect):
+				leaves.extend(comp.get_leaves_in(rect))
+		return leaves
+
 	def set_x(self, x):
 		self.x = x
 
@@ -69,20 +106,33 @@ class PComponent:
 	def get_height(self):
 		return self.height
 
+	def get_rect(self):
+		return pygame.Rect(self.x, self.y, self.width, self.height)
+
 """
 PComponent to hold other PComponents
 Automatically adjusts x, y, width and height values of all contained PComponents when a new one is added
-Doesn't paint itself, but calls paint() for each of its sub-PComponents
+When a sub-PComponent is added or resized, only the sub-PComponents after it are moved, and the PPanel's parent is only told about it if the PPanel's own size changed
+add_components() adds many PComponents at once and only fits the PPanel to them, leaving the layout pass to the caller
+Doesn't paint itself, but calls paint() for each of its sub-PComponents that is inside the surface's clip rectangle, clipping those that are only partly inside it
 Sends mouse events to appropriate sub-PComponent
 """
 class PPanel(PComponent):
 	def __init__(self, orientation, debug_name = "Anonymous"):
 		PComponent.__init__(self, 0, 0, 0, 0, debug_name)
 		self.orientation = orientation
+		self.sizes = {}
 
 	def paint(self, surface, window):
+		clip = surface.get_clip()
 		for comp in self.components:
-			comp.paint(surface, window)
+			rect = comp.get_rect()
+			if clip.contains(rect):
+				comp.paint(surface, window)
+			elif clip.colliderect(rect):
+				surface.set_clip(clip.clip(rect))
+				comp.paint(surface, window)
+				surface.set_clip(clip)
 
 	def mouse_down(self, x, y, window):
 		window.set_focus(self)
@@ -118,27 +168,62 @@ class PPanel(PComponent):
 	
 	def adjust_parent(self):
 		if self.parent != None:
-			if self.parent.orientation == VERTICAL_ORIENTATION:
-				newHeight = 0
-				newWidth = 0
-				for comp in self.parent.components:
-					newHeight += comp.get_height()
-					newWidth = max(newWidth, comp.get_width())
-				self.parent.set_height(newHeight)
-				self.parent.set_width(newWidth)
-
-			elif self.parent.orientation == HORIZONTAL_ORIENTATION:
-				newHeight = 0
-				newWidth = 0
-				for comp in self.parent.components:
-					newWidth += comp.get_width()
-					newHeight = max(newHeight, comp.get_height())
-				self.parent.set_height(newHeight)
-				self.parent.set_width(newWidth)
-			self.parent.adjust_parent()
+			self.parent.adjust_child(self)
 
-		else:
-			self.adjust_children()
+	def adjust_child(self, child):
+		size = (self.get_width(), self.get_height())
+		old_width, old_height = self.sizes[child]
+		self.sizes[child] = (child.get_width(), child.get_height())
+		index = self.components.index(child)
+		if self.orientation == VERTICAL_ORIENTATION:
+			currentY = child.get_y() + child.get_height()
+			for comp in self.components[index + 1:]:
+				if comp.get_y() != currentY:
+					comp.set_y(currentY)
+					comp.adjust_children()
+				currentY += comp.get_height()
+			self.set_height(currentY - self.get_y())
+			if child.get_width() >= self.get_width():
+				self.set_width(child.get_width())
+			elif old_width == self.get_width():
+				self.set_width(max([width for width, height in self.sizes.values()]))
+
+		elif self.orientation == HORIZONTAL_ORIENTATION:
+			currentX = child.get_x() + child.get_width()
+			for comp in self.components[index + 1:]:
+				if comp.get_x() != currentX:
+					comp.set_x(currentX)
+					comp.adjust_children()
+				currentX += comp.get_width()
+			self.set_width(currentX - self.get_x())
+			if child.get_height() >= self.get_height():
+				self.set_height(child.get_height())
+			elif old_height == self.get_height():
+				self.set_height(max([height for width, height in self.sizes.values()]))
+
+		if (self.get_width(), self.get_height()) != size:
+			self.adjust_parent()
+
+	def fit_components(self):
+		for comp in self.components:
+			self.sizes[comp] = (comp.get_width(), comp.get_height())
+		if self.orientation == VERTICAL_ORIENTATION:
+			newHeight = 0
+			newWidth = 0
+			for comp in self.components:
+				newHeight += comp.get_height()
+				newWidth = max(newWidth, comp.get_width())
+			self.set_height(newHeight)
+			self.set_width(newWidth)
+
+		elif self.orientation == HORIZONTAL_ORIENTATION:
+			newHeight = 0
+			newWidth = 0
+			for comp in self.components:
+				newWidth += comp.get_width()
+				newHeight = max(newHeight, comp.get_height())
+			self.set_height(newHeight)
+			self.set_width(newWidth)
 
 	def add_component(self, component):
 		if component == self:
@@ -171,8 +256,243 @@ class PPanel(PComponent):
 
 		component.parent = self
 		self.components.append(component)
+		self.sizes[component] = (component.get_width(), component.get_height())
+		component.adjust_children()
 		self.adjust_parent()
 
+	def add_components(self, components):
+		for component in components:
+			if component == self:
+				sys.exit("Can't add panel to itself")
+			component.parent = self
+			self.components.append(component)
+		self.fit_components()
+
+
+"""
+PPanel that holds other PComponents in the cells of a grid of rows and columns
+Each row height and column width is either a number of pixels, GRID_AUTO to fit the largest PComponent in it, or a proportion such as "*" or "2*" of the space left over within the given width and height
+The measured size of each PComponent is cached, so adding or resizing a PComponent only measures its own row and column again, and only when it was the largest PComponent in them and shrank. Only the PComponents in rows and columns that have moved are arranged again
+The PGridPanel's parent is only told about the change if the PGridPanel's own size changed
+add_components() takes a list of (component, row, column) and measures each affected row and column once, leaving the layout pass to the caller
+"""
+class PGridPanel(PPanel):
+	def __init__(self, rows, columns, width = 0, height = 0, debug_name = "Anonymous"):
+		PPanel.__init__(self, None, debug_name)
+		self.rows = PGridTracks(rows, height)
+		self.columns = PGridTracks(columns, width)
+		self.cells = {}
+		self.measures = {}
+		self.positions = {}
+		self.changed = set()
+		self.update_tracks()
+
+	def add_component(self, component, row = 0, column = 0):
+		if component == self:
+			sys.exit("Can't add panel to itself")
+		component.parent = self
+		self.components.append(component)
+		self.cells[component] = (row, column)
+		self.rows.add_member(row, component)
+		self.columns.add_member(column, component)
+		self.adjust_child(component)
+
+	def add_components(self, cells):
+		rows = set()
+		columns = set()
+		for component, row, column in cells:
+			if component == self:
+				sys.exit("Can't add panel to itself")
+			component.parent = self
+			self.components.append(component)
+			self.cells[component] = (row, column)
+			self.measures[component] = (component.get_width(), component.get_height())
+			self.rows.add_member(row, component)
+			self.columns.add_member(column, component)
+			self.changed.add(component)
+			rows.add(row)
+			columns.add(column)
+		for row in rows:
+			self.measure_row(row)
+		for column in columns:
+			self.measure_column(column)
+		self.update_tracks()
+
+	def fit_components(self):
+		rows = set()
+		columns = set()
+		for comp in self.components:
+			measure = (comp.get_width(), comp.get_height())
+			if measure != self.measures[comp]:
+				self.measures[comp] = measure
+				self.changed.add(comp)
+				row, column = self.cells[comp]
+				rows.add(row)
+				columns.add(column)
+		for row in rows:
+			self.measure_row(row)
+		for column in columns:
+			self.measure_column(column)
+		if len(rows) != 0 or len(columns) != 0:
+			self.update_tracks()
+
+	def adjust_child(self, child):
+		size = (self.get_width(), self.get_height())
+		row, column = self.cells[child]
+		old = self.measures.get(child)
+		measure = (child.get_width(), child.get_height())
+		self.measures[child] = measure
+		if old != None and old[1] == self.rows.get_fit(row) and measure[1] < old[1]:
+			self.measure_row(row)
+		else:
+			self.rows.set_fit(row, max(self.rows.get_fit(row), measure[1]))
+		if old != None and old[0] == self.columns.get_fit(column) and measure[0] < old[0]:
+			self.measure_column(column)
+		else:
+			self.columns.set_fit(column, max(self.columns.get_fit(column), measure[0]))
+		moved_rows = self.rows.update_track(row)
+		moved_columns = self.columns.update_track(column)
+		self.set_height(self.rows.get_length())
+		self.set_width(self.columns.get_length())
+		self.place(child, False)
+		for moved in moved_rows:
+			for comp in self.rows.get_members(moved):
+				self.place(comp, False)
+		for moved in moved_columns:
+			for comp in self.columns.get_members(moved):
+				self.place(comp, False)
+		if (self.get_width(), self.get_height()) != size:
+			self.adjust_parent()
+
+	def adjust_children(self):
+		for comp in self.components:
+			self.place(comp, comp in self.changed)
+		self.changed = set()
+
+	def place(self, comp, changed):
+		row, column = self.cells[comp]
+		position = (self.get_x() + self.columns.get_offset(column), self.get_y() + self.rows.get_offset(row))
+		if changed or self.positions.get(comp) != position:
+			comp.set_x(position[0])
+			comp.set_y(position[1])
+			comp.adjust_children()
+			self.positions[comp] = position
+
+	def measure_row(self, row):
+		self.rows.set_fit(row, max([self.measures[comp][1] for comp in self.rows.get_members(row)] + [0]))
+
+	def measure_column(self, column):
+		self.columns.set_fit(column, max([self.measures[comp][0] for comp in self.columns.get_members(column)] + [0]))
+
+	def update_tracks(self):
+		self.rows.update()
+		self.columns.update()
+		self.set_height(self.rows.get_length())
+		self.set_width(self.columns.get_length())
+
+
+"""
+The rows or columns of a PGridPanel. Should only be used by PGridPanel
+Keeps the size of each track and the offsets of the tracks computed so far. Resizing a fixed or automatic track only invalidates the offsets after it, which are computed again when asked for, so the tracks after the last one with PComponents in it cost nothing
+Proportional tracks depend on every other track, so any change resolves them all again
+"""
+class PGridTracks:
+	def __init__(self, sizes, total):
+		self.sizes = [parse_grid_size(size) for size in sizes]
+		self.total = total
+		self.fits = [0] * len(sizes)
+		self.resolved = [0] * len(sizes)
+		self.offsets = [0] * len(sizes)
+		self.valid = 0
+		self.length = 0
+		self.members = [[] for size in sizes]
+		self.last = -1
+		self.proportional = False
+		for kind, value in self.sizes:
+			if kind == GRID_PROPORTIONAL:
+				self.proportional = True
+
+	def add_member(self, index, component):
+		self.members[index].append(component)
+		self.last = max(self.last, index)
+
+	def get_members(self, index):
+		return self.members[index]
+
+	def get_fit(self, index):
+		return self.fits[index]
+
+	def set_fit(self, index, fit):
+		self.fits[index] = fit
+
+	def update(self):
+		self.resolved = resolve_grid_sizes(self.sizes, self.fits, self.total)
+		self.length = sum(self.resolved)
+		self.valid = 0
+
+	def update_track(self, index):
+		if self.proportional:
+			self.update()
+			return range(len(self.sizes))
+		kind, value = self.sizes[index]
+		size = value
+		if kind == GRID_FIT:
+			size = self.fits[index]
+		if size == self.resolved[index]:
+			return []
+		self.length += size - self.resolved[index]
+		self.resolved[index] = size
+		self.valid = min(self.valid, index + 1)
+		return range(index + 1, self.last + 1)
+
+	def get_offset(self, index):
+		while self.valid <= index:
+			if self.valid == 0:
+				self.offsets[0] = 0
+			else:
+				self.offsets[self.valid] = self.offsets[self.valid - 1] + self.resolved[self.valid - 1]
+			self.valid += 1
+		return self.offsets[index]
+
+	def get_length(self):
+		return max(self.length, self.total)
+
+
+"""
+Converts a PGridPanel row or column size into a (kind, value) pair
+"""
+def parse_grid_size(size):
+	if size == GRID_AUTO:
+		return (GRID_FIT, 0)
+	if hasattr(size, "endswith") and size.endswith("*"):
+		if size == "*":
+			return (GRID_PROPORTIONAL, 1)
+		return (GRID_PROPORTIONAL, float(size[:-1]))
+	return (GRID_FIXED, size)
+
+"""
+Returns the size in pixels of each row or column of a PGridPanel, given the sizes of their largest PComponents and the total space available
+Proportional rows and columns share the space left over by the others, but never shrink below their largest PComponent
+"""
+def resolve_grid_sizes(sizes, fits, total):
+	resolved = []
+	used = 0
+	weights = 0
+	for (kind, value), fit in zip(sizes, fits):
+		if kind == GRID_FIXED:
+			resolved.append(value)
+		elif kind == GRID_FIT:
+			resolved.append(fit)
+		else:
+			resolved.append(0)
+			weights += value
+		used += resolved[-1]
+	remaining = max(total - used, 0)
+	for i, ((kind, value), fit) in enumerate(zip(sizes, fits)):
+		if kind == GRID_PROPORTIONAL:
+			resolved[i] = max(int(remaining * value / weights), fit)
+	return resolved
+
 
 """
 PComponent to display text value using given font
@@ -181,15 +501,15 @@ class PLabel(PComponent):
 	def __init__(self, gc, value, debug_name = "Anonymous"):
 		PComponent.__init__(self, 0, 0, 0, 0, debug_name)
 		self.gc = gc
-		self.value = str(value)
-		self.set_width((len(value) * (gc.font.get_fontsize() + gc.font.get_fontspacing())) - gc.font.get_fontspacing())
+		self.value = pdrawstring.totext(value)
+		self.set_width(gc.font.measure(self.value))
 		self.set_height(gc.font.get_fontsize())
 
 	def paint(self, surface, window):
 		pdrawstring.pdrawstring(surface, self.gc.font, self.x, self.y, self.value)
 
 	def set_value(self, value):
-		self.value = str(value)
+		self.value = pdrawstring.totext(value)
 
 	def get_value(self):
 		return self.value
@@ -198,42 +518,80 @@ class PLabel(PComponent):
 PComponent that acts like a PLabel, but wraps lines that extend past max_width pixels and takes newline characters into consideration, left-aligning all lines
 Does not support value set or get
 Will wrap in the middle of a word - use caution when determining line length and max_width
+The text is drawn once into an off-screen surface, which is reused when the text is wrapped again with set_max_width() and only grows when it is too small
 """
 class PParagraph(PComponent):
 	def __init__(self, gc, value, max_width, debug_name = "Anonymous"):
 		PComponent.__init__(self, 0, 0, 0, 0, debug_name)
 		self.gc = gc
-		self.value = str(value)
+		self.value = pdrawstring.totext(value)
+		self.surface = None
+		self.surface = self.paint_surface(max_width)
+
+	def set_max_width(self, max_width):
 		self.surface = self.paint_surface(max_width)
 
 	def paint_surface(self, max_width):
-		maxchars = max_width / (self.gc.font.get_fontsize() + self.gc.font.get_fontspacing())
+		font = self.gc.font
+		maxchars = font.fit_chars(max_width)
 		line = ""
 		linelist = []
-		width = 0
 		for char in self.value:
 			if char == "\n":
 				linelist.append(line)
-				width = max(width, len(line))
 				line = ""
 			elif len(line) >= maxchars:
 				linelist.append(line)
-				width = max(width, len(line))
 				line = char
 			else:
 				line += char
 		linelist.append(line)
-		self.set_width(width * (self.gc.font.get_fontsize() + self.gc.font.get_fontspacing()) - self.gc.font.get_fontspacing())
-		self.set_height(len(linelist) * (self.gc.font.get_fontsize() + self.gc.font.get_fontspacing()) - self.gc.font.get_fontspacing())
-		ret_surface = pygame.Surface((self.get_width(), self.get_height()))
-		ret_surface.fill((255, 0, 255))
-		ret_surface.set_colorkey((255, 0, 255))
+		self.set_width(max(font.measure_many(linelist)))
+		self.set_height(len(linelist) * font.get_advance() - font.get_fontspacing())
+		ret_surface = grow_surface(self.surface, self.get_width(), self.get_height())
+		ret_surface.fill((255, 0, 255), pygame.Rect(0, 0, self.get_width(), self.get_height()))
 		for i, line in enumerate(linelist):
-			pdrawstring.pdrawstring(ret_surface, self.gc.font, 0, i * (self.gc.font.get_fontspacing() + self.gc.font.get_fontsize()), line)
+			pdrawstring.pdrawstring(ret_surface, font, 0, i * font.get_advance(), line)
 		return ret_surface
 
 	def paint(self, surface, window):
-		surface.blit(self.surface, (self.get_x(), self.get_y()))
+		surface.blit(self.surface, (self.get_x(), self.get_y()), pygame.Rect(0, 0, self.get_width(), self.get_height()))
+
+
+"""
+PComponent that displays an image file scaled to the given width and height
+The image is decoded in a background thread and a placeholder is painted until it is ready
+Decoded images and their scaled copies are shared between PImages through a PImageCache, so repeated images are neither decoded nor scaled again
+"""
+class PImage(PComponent):
+	def __init__(self, gc, filename, width, height, cache = None, debug_name = "Anonymous"):
+		PComponent.__init__(self, 0, 0, width, height, debug_name)
+		if cache == None:
+			from drawing import pimagecache
+			cache = pimagecache.get_default_cache()
+		self.gc = gc
+		self.cache = cache
+		self.set_value(filename)
+
+	def paint(self, surface, window):
+		if self.image == None or self.image.get_size() != (self.get_width(), self.get_height()):
+			self.image = self.cache.get(self.filename, self.get_width(), self.get_height())
+		if self.image != None:
+			surface.blit(self.image, (self.get_x(), self.get_y()))
+		else:
+			pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()))
+			pygame.draw.rect(surface, self.gc.border_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()), 2)
+
+	def set_value(self, filename):
+		self.filename = filename
+		self.image = None
+		self.cache.request(filename)
+
+	def get_value(self):
+		return self.filename
+
+	def is_ready(self):
+		return self.image != None
 
 
 """
@@ -261,7 +619,7 @@ Supports value set and get
 class PButton(PComponent):
 	def __init__(self, gc, value, debug_name = "Anonymous"):
 		PComponent.__init__(self, 0, 0, 0, 0, debug_name)
-		self.set_width((len(value) * (gc.font.get_fontsize() + gc.font.get_fontspacing())) + gc.font.get_fontspacing() + 4)
+		self.set_width(gc.font.measure(value) + (2 * gc.font.get_fontspacing()) + 4)
 		self.set_height(gc.font.get_fontsize() + 4 + (2 * gc.font.get_fontspacing()))
 		self.gc = gc
 		self.value = value
@@ -282,7 +640,7 @@ class PButton(PComponent):
 			window.reset_focus()
 
 	def set_value(self, value):
-		self.value = str(value)
+		self.value = pdrawstring.totext(value)
 
 	def get_value(self):
 		return self.value
@@ -300,10 +658,10 @@ class PCheckBox(PComponent):
 			PComponent.__init__(self, 0, 0, 20, 20, debug_name)
 		else:
 			PComponent.__init__(self, 0, 0, 0, gc.font.get_fontsize(), debug_name)
-			self.set_width(gc.font.get_fontsize() + (len(label) * (gc.font.get_fontsize() + gc.font.get_fontspacing())))
+			self.set_width(gc.font.get_fontsize() + gc.font.get_fontspacing() + gc.font.measure(label))
 		self.value = False
 		self.actions = []
-		self.label = str(label)
+		self.label = pdrawstring.totext(label)
 		self.gc = gc
 
 	def paint(self, surface, window):
@@ -369,7 +727,7 @@ class PSelector(PComponent):
 			window.reset_focus()
 
 	def add_option(self, value):
-		self.options.insert(0, str(value))
+		self.options.insert(0, pdrawstring.totext(value))
 
 	def scroll_up(self):
 		self.offset = max(0, self.offset - 1)
@@ -482,8 +840,8 @@ class PTextBox(PComponent):
 		self.maxlength = maxlength
 		self.offset = 0
 		self.cursor = 0
-		width = max_width - (max_width % (gc.font.get_fontsize() + gc.font.get_fontspacing()))
-		self.maxchars = (width - 4) / (gc.font.get_fontsize() + gc.font.get_fontspacing())
+		width = max_width - (max_width % gc.font.get_advance())
+		self.maxchars = gc.font.fit_chars(width - 4)
 		self.set_width(width + 2)
 		self.set_height(gc.font.get_fontsize() + 4 + (2 * gc.font.get_fontspacing()))
 
@@ -491,12 +849,12 @@ class PTextBox(PComponent):
 		pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()))
 		pygame.draw.rect(surface, self.gc.border_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()), 2)
 		if window.get_focus() == self:
-			pygame.draw.rect(surface, self.gc.cursor_colour, pygame.Rect(self.get_x() + ((self.cursor - self.offset) * (self.gc.font.get_fontsize() + self.gc.font.get_fontspacing())) + 2, self.get_y() + 2, self.gc.font.get_fontsize(), self.get_height() - 4))
+			pygame.draw.rect(surface, self.gc.cursor_colour, pygame.Rect(self.get_x() + ((self.cursor - self.offset) * self.gc.font.get_advance()) + 2, self.get_y() + 2, self.gc.font.get_fontsize(), self.get_height() - 4))
 		pdrawstring.pdrawstring(surface, self.gc.font, self.get_x() + self.gc.font.get_fontspacing() + 2, self.get_y() + self.gc.font.get_fontspacing() + 2, self.value[self.offset:])
 
 	def mouse_down(self, x, y, window):
 		window.set_focus(self)
-		self.cursor = min(((x - self.get_x() - 2) / (self.gc.font.get_fontsize() + self.gc.font.get_fontspacing())) + self.offset, len(self.value))
+		self.cursor = min(((x - self.get_x() - 2) / self.gc.font.get_advance()) + self.offset, len(self.value))
 
 	def key_down(self, key, window):
 		if window.focus == self:
@@ -589,8 +947,138 @@ class PTextBox(PComponent):
 		return self.value
 
 
+"""
+PComponent that displays rows lines at a time of a text file, which may be far larger than memory
+The file is memory-mapped and indexed in the background by a PWindow task, LOG_INDEX_CHUNK bytes at a time, keeping the offset of every LOG_INDEX_STRIDE-th line only
+The file is checked for growth every poll_interval milliseconds, like tail -f. If follow is True, the view stays scrolled to the end of the file as it grows
+Only the visible lines are decoded and drawn, and the most recently drawn cache_lines lines are cached
+Lines are decoded as UTF-8 into unicode strings. Invalid bytes become U+FFFD, which is drawn with the font's fallback glyph
+Supports scrolling through the use of scroll_up(), scroll_down() and scroll_to() methods
+"""
+class PLogView(PComponent):
+	def __init__(self, gc, filename, width, rows, follow = False, poll_interval = 1000, cache_lines = None, debug_name = "Anonymous"):
+		PComponent.__init__(self, 0, 0, width, (rows * gc.font.get_advance()) - gc.font.get_fontspacing() + 4, debug_name)
+		self.gc = gc
+		self.rows = rows
+		self.follow = follow
+		self.poll_interval = poll_interval
+		self.cache_lines = cache_lines
+		if cache_lines == None:
+			self.cache_lines = rows * 4
+		self.maxchars = gc.font.fit_chars(width - 4)
+		self.file = open(filename, "rb")
+		self.map = None
+		self.size = 0
+		self.offset = 0
+		self.task = None
+		self.poller = None
+		self.reset_index()
+		self.remap()
+
+	def reset_index(self):
+		self.checkpoints = [0]
+		self.line_count = 0
+		self.line_end = 0
+		self.scanned = 0
+		self.lines = collections.OrderedDict()
+
+	def remap(self):
+		size = os.fstat(self.file.fileno()).st_size
+		if size == self.size:
+			return False
+		if size < self.size:
+			self.reset_index()
+		if self.map != None:
+			self.map.close()
+			self.map = None
+		if size > 0:
+			self.map = mmap.mmap(self.file.fileno(), size, access = mmap.ACCESS_READ)
+		self.size = size
+		self.lines.pop(self.line_count, None)
+		return True
+
+	def index_lines(self):
+		while self.scanned < self.size:
+			end = min(self.scanned + LOG_INDEX_CHUNK, self.size)
+			newline = self.map.find(b"\n", self.scanned, end)
+			while newline != -1:
+				self.line_count += 1
+				self.line_end = newline + 1
+				if self.line_count % LOG_INDEX_STRIDE == 0:
+					self.checkpoints.append(self.line_end)
+				newline = self.map.find(b"\n", self.line_end, end)
+			self.scanned = end
+			if self.follow:
+				self.scroll_to(self.get_line_count())
+			yield
+		self.task = None
+
+	def poll(self, window):
+		if self.remap() and self.task == None:
+			self.task = window.add_task(self.index_lines())
+
+	def get_line(self, number):
+		start = self.checkpoints[number // LOG_INDEX_STRIDE]
+		for i in range(number % LOG_INDEX_STRIDE):
+			start = self.map.find(b"\n", start) + 1
+		end = self.map.find(b"\n", start, start + (self.maxchars * 4) + 1)
+		if end == -1:
+			end = min(start + (self.maxchars * 4), self.size)
+		return self.map[start:end].decode("utf-8", "replace").rstrip("\r")[:self.maxchars]
+
+	def get_line_surface(self, number):
+		line_surface = self.lines.pop(number, None)
+		if line_surface == None:
+			line = self.get_line(number)
+			line_surface = pygame.Surface((max(self.gc.font.measure(line), 1), self.gc.font.get_fontsize()))
+			line_surface.fill((255, 0, 255))
+			line_surface.set_colorkey((255, 0, 255))
+			pdrawstring.pdrawstring(line_surface, self.gc.font, 0, 0, line)
+			if len(self.lines) >= self.cache_lines:
+				self.lines.popitem(last = False)
+		self.lines[number] = line_surface
+		return line_surface
+
+	def paint(self, surface, window):
+		if self.poller == None:
+			self.poller = window.call_every(self.poll_interval, self.poll)
+			if self.scanned < self.size:
+				self.task = window.add_task(self.index_lines())
+		pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()))
+		pygame.draw.rect(surface, self.gc.border_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()), 2)
+		for i, number in enumerate(range(self.offset, min(self.offset + self.rows, self.get_line_count()))):
+			surface.blit(self.get_line_surface(number), (self.get_x() + 2, self.get_y() + 2 + (i * self.gc.font.get_advance())))
+
+	def get_line_count(self):
+		if self.scanned == self.size and self.line_end < self.size:
+			return self.line_count + 1
+		return self.line_count
+
+	def get_offset(self):
+		return self.offset
+
+	def scroll_up(self, lines = 1):
+		self.scroll_to(self.offset - lines)
+
+	def scroll_down(self, lines = 1):
+		self.scroll_to(self.offset + lines)
+
+	def scroll_to(self, line_number):
+		self.offset = max(min(line_number, self.get_line_count() - self.rows), 0)
+
+	def close(self):
+		if self.poller != None:
+			self.poller.cancel()
+		if self.task != None:
+			self.task.cancel()
+		if self.map != None:
+			self.map.close()
+		self.file.close()
+
+
 """
 PComponent that acts like a standard vertical scrollbar, executing 0 or more functions on updates
+While the thumb is dragged the value follows the mouse, but the functions are executed at most once per frame, and once more when the mouse is released
 """
 class PVerticalScrollBar(PComponent):
 	def __init__(self, gc, maximum, thumb_height = 30, debug_name = "Anonymous"):
@@ -600,25 +1088,42 @@ class PVerticalScrollBar(PComponent):
 		self.maximum = maximum
 		self.thumb_height = thumb_height
 		self.actions = []
+		self.actions_pending = False
 
 	def paint(self, surface, window):
 		pygame.draw.rect(surface, self.gc.border_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()))
-		if window.get_focus() == self:
-			mouse_x, mouse_y = pygame.mouse.get_pos()
-			pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x(), max(min(mouse_y - (self.thumb_height / 2), self.get_height() + self.get_y() - self.thumb_height), self.get_y()), self.get_width(), self.thumb_height))
-		else:
-			pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x(), self.get_y() + max(min(self.value * (self.get_height() - self.thumb_height) / self.maximum, self.get_height() - self.thumb_height), 0), self.get_width(), self.thumb_height))
+		pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x(), self.get_y() + max(min(self.value * (self.get_height() - self.thumb_height) / self.maximum, self.get_height() - self.thumb_height), 0), self.get_width(), self.thumb_height))
 
 	def mouse_down(self, x, y, window):
 		window.set_focus(self)
+		self.drag_to(y, window)
+
+	def mouse_motion(self, x, y, window):
+		if window.get_focus() == self:
+			self.drag_to(y, window)
 
 	def mouse_up(self, x, y, window):
 		if window.get_focus() == self:
-			mouse_x, mouse_y = pygame.mouse.get_pos()
-			self.value = max(min((mouse_y - self.get_y() - (self.thumb_height / 2)) * self.maximum / (self.get_height() - self.thumb_height), self.maximum),0)
+			self.set_value_at(y)
+			self.actions_pending = True
+			self.flush_actions(window)
+			window.reset_focus()
+
+	def set_value_at(self, y):
+		self.value = max(min((y - self.get_y() - (self.thumb_height / 2)) * self.maximum / max(self.get_height() - self.thumb_height, 1), self.maximum), 0)
+
+	def drag_to(self, y, window):
+		value = self.value
+		self.set_value_at(y)
+		if self.value != value:
+			self.actions_pending = True
+			window.coalesce_action(self.flush_actions)
+
+	def flush_actions(self, window):
+		if self.actions_pending:
+			self.actions_pending = False
 			for action in self.actions:
 				action(self)
-			window.reset_focus()
 
 	def adjust_children(self):
 		self.set_height(self.parent.get_height())
@@ -641,6 +1146,7 @@ class PVerticalScrollBar(PComponent):
 
 """
 PComponent that acts like a standard horizontal scrollbar, executing 0 or more functions on updates
+While the thumb is dragged the value follows the mouse, but the functions are executed at most once per frame, and once more when the mouse is released
 """
 class PHorizontalScrollBar(PComponent):
 	def __init__(self, gc, maximum, thumb_width = 30, debug_name = "Anonymous"):
@@ -650,25 +1156,42 @@ class PHorizontalScrollBar(PComponent):
 		self.maximum = maximum
 		self.thumb_width = thumb_width
 		self.actions = []
+		self.actions_pending = False
 
 	def paint(self, surface, window):
 		pygame.draw.rect(surface, self.gc.border_colour, pygame.Rect(self.get_x(), self.get_y(), self.get_width(), self.get_height()))
-		if window.get_focus() == self:
-			mouse_x, mouse_y = pygame.mouse.get_pos()
-			pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(max(min(mouse_x - (self.thumb_width / 2), self.get_width() + self.get_x() - self.thumb_width), self.get_x()), self.get_y(), self.thumb_width, self.get_height()))
-		else:
-			pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x() + max(min(self.value * (self.get_width() - self.thumb_width) / self.maximum, self.get_width() - self.thumb_width), 0), self.get_y(), self.thumb_width, self.get_height()))
+		pygame.draw.rect(surface, self.gc.background_colour, pygame.Rect(self.get_x() + max(min(self.value * (self.get_width() - self.thumb_width) / self.maximum, self.get_width() - self.thumb_width), 0), self.get_y(), self.thumb_width, self.get_height()))
 
 	def mouse_down(self, x, y, window):
 		window.set_focus(self)
+		self.drag_to(x, window)
+
+	def mouse_motion(self, x, y, window):
+		if window.get_focus() == self:
+			self.drag_to(x, window)
 
 	def mouse_up(self, x, y, window):
 		if window.get_focus() == self:
-			mouse_x, mouse_y = pygame.mouse.get_pos()
-			self.value = max(min((mouse_x - self.get_x() - (self.thumb_width / 2)) * self.maximum / (self.get_width() - self.thumb_width), self.maximum),0)
+			self.set_value_at(x)
+			self.actions_pending = True
+			self.flush_actions(window)
+			window.reset_focus()
+
+	def set_value_at(self, x):
+		self.value = max(min((x - self.get_x() - (self.thumb_width / 2)) * self.maximum / max(self.get_width() - self.thumb_width, 1), self.maximum), 0)
+
+	def drag_to(self, x, window):
+		value = self.value
+		self.set_value_at(x)
+		if self.value != value:
+			self.actions_pending = True
+			window.coalesce_action(self.flush_actions)
+
+	def flush_actions(self, window):
+		if self.actions_pending:
+			self.actions_pending = False
 			for action in self.actions:
 				action(self)
-			window.reset_focus()
 
 	def adjust_children(self):
 		self.set_width(self.parent.get_width())
@@ -692,6 +1215,9 @@ class PHorizontalScrollBar(PComponent):
 """
 PComponent that acts as a PPanel that contains scrollbars on the bottom and right sides if the panel's size exceeds the given maximum width and/or height
 Does not exceed max_width or max_height
+Pixels painted into the content surface are kept between frames, so scrolling only repaints the strips of content that have just become visible
+Each PComponent that reaches into a strip is cleared and repainted in full without a clip, because pygame doesn't draw thick rectangle borders correctly through a thin clip
+The content surface only grows, geometrically, so adding PComponents or resizing the panel with set_max_size() doesn't reallocate it each time
 """
 class PScrollPanel(PComponent):
 	def __init__(self, gc, max_width, max_height, orientation, debug_name = "Anonymous"):
@@ -700,11 +1226,10 @@ class PScrollPanel(PComponent):
 		self.main_panel = PPanel(orientation, debug_name + "_main_panel")
 		self.max_width = max_width
 		self.max_height = max_height
-		self.surface = pygame.Surface((0, 0))
-		self.surface.fill((255, 0, 255))
-		self.surface.set_colorkey((255, 0, 255))
+		self.surface = grow_surface(None, 0, 0)
 		self.y_offset = 0
 		self.x_offset = 0
+		self.painted_view = None
 		self.scroll_vertical = False
 		self.scroll_horizontal = False
 		self.vertical_scroll = PVerticalScrollBar(self.gc, self.max_height, 30, debug_name + "_vertical_scroll")
@@ -719,16 +1244,24 @@ class PScrollPanel(PComponent):
 		self.horizontal_scroll.set_height(0)
 
 	def paint(self, surface, window):
-		self.main_panel.paint(self.surface, window)
 		width = self.get_width()
 		height = self.get_height()
 		if self.scroll_vertical:
 			width -= self.vertical_scroll.get_width()
 		if self.scroll_horizontal:
 			height -= self.horizontal_scroll.get_height()
-		surface.blit(self.surface, (self.get_x(), self.get_y()), pygame.Rect(self.x_offset, self.y_offset, width, height))
-		self.vertical_scroll.paint(surface, window)
-		self.horizontal_scroll.paint(surface, window)
+		view = pygame.Rect(self.x_offset, self.y_offset, width, height)
+		if self.painted_view != None and self.painted_view.size == view.size and self.painted_view != view:
+			for rect in exposed_rects(view, self.painted_view):
+				self.paint_content(rect, window)
+		else:
+			self.paint_content(view, window)
+		self.painted_view = view
+		surface.blit(self.surface, (self.get_x(), self.get_y()), view)
+		if self.scroll_vertical:
+			self.vertical_scroll.paint(surface, window)
+		if self.scroll_horizontal:
+			self.horizontal_scroll.paint(surface, window)
 
 	def mouse_down(self, x, y, window):
 		if self.vertical_scroll.contains_point(x, y):
@@ -756,6 +1289,14 @@ class PScrollPanel(PComponent):
 		self.main_panel.set_x(self.get_x())
 		self.main_panel.set_y(self.get_y())
 
+	def paint_content(self, rect, window):
+		leaves = self.main_panel.get_leaves_in(rect)
+		self.surface.fill((255, 0, 255), rect)
+		for comp in leaves:
+			self.surface.fill((255, 0, 255), comp.get_rect())
+		for comp in leaves:
+			comp.paint(self.surface, window)
+
 	def action_scroll_v(self, bar):
 		self.y_offset = bar.get_value()
 
@@ -764,9 +1305,34 @@ class PScrollPanel(PComponent):
 
 	def add_component(self, component):
 		self.main_panel.add_component(component)
-		self.surface = pygame.Surface((self.main_panel.get_width(), self.main_panel.get_height()))
-		self.surface.fill((255, 0, 255))
-		self.surface.set_colorkey((255, 0, 255))
+		self.update_viewport()
+
+	def set_max_size(self, max_width, max_height):
+		self.max_width = max_width
+		self.max_height = max_height
+		if self.scroll_vertical and self.main_panel.get_height() <= max_height:
+			self.scroll_vertical = False
+			self.vertical_scroll.actions.remove(self.action_scroll_v)
+			self.vertical_scroll.set_width(0)
+			self.vertical_scroll.set_height(0)
+			self.y_offset = 0
+		if self.scroll_horizontal and self.main_panel.get_width() <= max_width:
+			self.scroll_horizontal = False
+			self.horizontal_scroll.actions.remove(self.action_scroll_h)
+			self.horizontal_scroll.set_width(0)
+			self.horizontal_scroll.set_height(0)
+			self.x_offset = 0
+		self.update_viewport()
+		if self.scroll_vertical:
+			self.vertical_scroll.value = min(self.vertical_scroll.get_value(), self.vertical_scroll.get_maximum())
+			self.y_offset = self.vertical_scroll.get_value()
+		if self.scroll_horizontal:
+			self.horizontal_scroll.value = min(self.horizontal_scroll.get_value(), self.horizontal_scroll.get_maximum())
+			self.x_offset = self.horizontal_scroll.get_value()
+
+	def update_viewport(self):
+		self.surface = grow_surface(self.surface, self.main_panel.get_width(), self.main_panel.get_height())
+		self.painted_view = None
 		self.set_width(min(self.main_panel.get_width(), self.max_width))
 		self.set_height(min(self.main_panel.get_height(), self.max_height))
 
@@ -776,12 +1342,12 @@ class PScrollPanel(PComponent):
 				self.vertical_scroll.add_action(self.action_scroll_v)
 
 		if self.scroll_vertical:
-			self.vertical_scroll.set_x(self.get_x() + self.get_width() - self.vertical_scroll.get_width())
-			self.vertical_scroll.set_y(self.get_y())
 			self.vertical_scroll.set_height(self.max_height - self.horizontal_scroll.get_height())
 			self.vertical_scroll.set_width(15)
 			self.vertical_scroll.set_maximum(self.main_panel.get_height() - self.max_height + self.horizontal_scroll.get_height())
 			self.set_width(min(self.main_panel.get_width() + self.horizontal_scroll.get_width(), self.max_width))
+			self.vertical_scroll.set_x(self.get_x() + self.get_width() - self.vertical_scroll.get_width())
+			self.vertical_scroll.set_y(self.get_y())
 
 		if not self.scroll_horizontal:
 			if self.main_panel.get_width() > self.max_width:
@@ -789,82 +1355,99 @@ class PScrollPanel(PComponent):
 				self.horizontal_scroll.add_action(self.action_scroll_h)
 
 		if self.scroll_horizontal:
-			self.horizontal_scroll.set_x(self.get_x())
-			self.horizontal_scroll.set_y(self.get_y() + self.get_height() - self.horizontal_scroll.get_height())
 			self.horizontal_scroll.set_height(15)
 			self.horizontal_scroll.set_width(self.max_width - self.vertical_scroll.get_width())
 			self.horizontal_scroll.set_maximum(self.main_panel.get_width() - self.max_width + self.vertical_scroll.get_width())
 			self.set_height(min(self.main_panel.get_height() + self.horizontal_scroll.get_height(), self.max_height))
+			self.horizontal_scroll.set_x(self.get_x())
+			self.horizontal_scroll.set_y(self.get_y() + self.get_height() - self.horizontal_scroll.get_height())
+
+
+"""
+Returns surface if it is at least width by height pixels, otherwise a new surface filled with the standard pink colorkey
+The new surface at least doubles in each dimension that is too small, so repeatedly growing a surface only reallocates it a logarithmic number of times
+"""
+def grow_surface(surface, width, height):
+	if surface != None:
+		if surface.get_width() >= width and surface.get_height() >= height:
+			return surface
+		if width > surface.get_width():
+			width = max(width, surface.get_width() * 2)
+		else:
+			width = surface.get_width()
+		if height > surface.get_height():
+			height = max(height, surface.get_height() * 2)
+		else:
+			height = surface.get_height()
+	grown = pygame.Surface((width, height))
+	grown.fill((255, 0, 255))
+	grown.set_colorkey((255, 0, 255))
+	return grown
+
+"""
+Returns the list of rectangles covering the parts of view that are not covered by old_view
+"""
+def exposed_rects(view, old_view):
+	if not view.colliderect(old_view):
+		return [view]
+	rects = []
+	if view.top < old_view.top:
+		rects.append(pygame.Rect(view.left, view.top, view.width, old_view.top - view.top))
+	if view.bottom > old_view.bottom:
+		rects.append(pygame.Rect(view.left, old_view.bottom, view.width, view.bottom - old_view.bottom))
+	top = max(view.top, old_view.top)
+	bottom = min(view.bottom, old_view.bottom)
+	if view.left < old_view.left:
+		rects.append(pygame.Rect(view.left, top, old_view.left - view.left, bottom - top))
+	if view.right > old_view.right:
+		rects.append(pygame.Rect(old_view.right, top, view.right - old_view.right, bottom - top))
+	return rects
 
 
 
 
 """
-Contains a dictionary mapping characters to the images defined in fontfile
+Characters, in the order they must appear in the fontfile of a PFont
+Both the space character and the underscore character are mapped to the same image
+"""
+FONT_CHARACTERS = "abcdefghijklmnopqrstuvwxyz1234567890+-/[]:.,# '?!"
+FONT_ALIASES = {"_": " "}
+
+"""
+Contains an atlas surface holding the images defined in fontfile and a table mapping character codepoints to the area of their image in the atlas
 Character images must be square with dimensions (fontsize, fontsize)
-Supported characters, in the order they must appear in the fontfile are:
+By default the supported characters, in the order they must appear in the fontfile are:
 abcdefghijklmnopqrstuvwxyz1234567890+-/[]:.,# _'?!
-Both the space character and the underscore character are mapped to the same image
+Other character sets can be used by passing characters, or by building the font from a manifest with load_font()
+Upper case letters without images of their own use the lower case image and unknown characters use the image of '?'
+Every character has the same advance (fontsize + fontspacing), so the width of a string only depends on its length
 """
 class PFont:
-	def __init__(self, fontfile, fontsize):
-		fontsheet = ptilesheet.PTileSheet(fontfile, fontsize)
+	def __init__(self, fontfile, fontsize, characters = FONT_CHARACTERS, aliases = FONT_ALIASES, atlas = None):
+		if atlas == None:
+			from drawing import pfontatlas
+			atlas = pfontatlas.PFontAtlas([(fontfile, characters)], fontsize, aliases)
 		self.fontsize = fontsize
 		self.fontspacing = min(max(1, fontsize / 10), 10)
-		self.dict = {}
-		self.dict['a'] = fontsheet.get_tile(0, 0)
-		self.dict['b'] = fontsheet.get_tile(1, 0)
-		self.dict['c'] = fontsheet.get_tile(2, 0)
-		self.dict['d'] = fontsheet.get_tile(3, 0)
-		self.dict['e'] = fontsheet.get_tile(4, 0)
-		self.dict['f'] = fontsheet.get_tile(5, 0)
-		self.dict['g'] = fontsheet.get_tile(6, 0)
-		self.dict['h'] = fontsheet.get_tile(7, 0)
-		self.dict['i'] = fontsheet.get_tile(8, 0)
-		self.dict['j'] = fontsheet.get_tile(9, 0)
-		self.dict['k'] = fontsheet.get_tile(10, 0)
-		self.dict['l'] = fontsheet.get_tile(11, 0)
-		self.dict['m'] = fontsheet.get_tile(12, 0)
-		self.dict['n'] = fontsheet.get_tile(13, 0)
-		self.dict['o'] = fontsheet.get_tile(14, 0)
-		self.dict['p'] = fontsheet.get_tile(15, 0)
-		self.dict['q'] = fontsheet.get_tile(16, 0)
-		self.dict['r'] = fontsheet.get_tile(17, 0)
-		self.dict['s'] = fontsheet.get_tile(18, 0)
-		self.dict['t'] = fontsheet.get_tile(19, 0)
-		self.dict['u'] = fontsheet.get_tile(20, 0)
-		self.dict['v'] = fontsheet.get_tile(21, 0)
-		self.dict['w'] = fontsheet.get_tile(22, 0)
-		self.dict['x'] = fontsheet.get_tile(23, 0)
-		self.dict['y'] = fontsheet.get_tile(24, 0)
-		self.dict['z'] = fontsheet.get_tile(25, 0)
-		self.dict['1'] = fontsheet.get_tile(26, 0)
-		self.dict['2'] = fontsheet.get_tile(27, 0)
-		self.dict['3'] = fontsheet.get_tile(28, 0)
-		self.dict['4'] = fontsheet.get_tile(29, 0)
-		self.dict['5'] = fontsheet.get_tile(30, 0)
-		self.dict['6'] = fontsheet.get_tile(31, 0)
-		self.dict['7'] = fontsheet.get_tile(32, 0)
-		self.dict['8'] = fontsheet.get_tile(33, 0)
-		self.dict['9'] = fontsheet.get_tile(34, 0)
-		self.dict['0'] = fontsheet.get_tile(35, 0)
-		self.dict['+'] = fontsheet.get_tile(36, 0)
-		self.dict['-'] = fontsheet.get_tile(37, 0)
-		self.dict['/'] = fontsheet.get_tile(38, 0)
-		self.dict['['] = fontsheet.get_tile(39, 0)
-		self.dict[']'] = fontsheet.get_tile(40, 0)
-		self.dict[':'] = fontsheet.get_tile(41, 0)
-		self.dict['.'] = fontsheet.get_tile(42, 0)
-		self.dict[','] = fontsheet.get_tile(43, 0)
-		self.dict['#'] = fontsheet.get_tile(44, 0)
-		self.dict[' '] = fontsheet.get_tile(45, 0)
-		self.dict['_'] = fontsheet.get_tile(45, 0) # Underscores are painted as whitespace
-		self.dict["'"] = fontsheet.get_tile(46, 0)
-		self.dict['?'] = fontsheet.get_tile(47, 0)
-		self.dict['!'] = fontsheet.get_tile(48, 0)
+		self.advance = fontsize + self.fontspacing
+		self.atlas = atlas
+		self.chars = {}
 
 	def get_char(self, char):
-		return self.dict.get(char.lower(), self.dict['?'])
+		image = self.chars.get(char)
+		if image == None:
+			image = self.atlas.get_atlas().subsurface(self.atlas.get_rect(char))
+			self.chars[char] = image
+		return image
+
+	def get_atlas(self):
+		return self.atlas.get_atlas()
+
+	def get_table(self):
+		return self.atlas.get_table()
+
+	def get_fallback(self):
+		return self.atlas.get_fallback()
 
 	def get_fontsize(self):
 		return self.fontsize
@@ -872,6 +1455,32 @@ class PFont:
 	def get_fontspacing(self):
 		return self.fontspacing
 
+	def get_advance(self):
+		return self.advance
+
+	def measure(self, text):
+		length = len(text)
+		if length == 0:
+			return 0
+		return (length * self.advance) - self.fontspacing
+
+	def measure_many(self, texts):
+		advance = self.advance
+		fontspacing = self.fontspacing
+		return [(length * advance) - fontspacing if length != 0 else 0 for length in map(len, texts)]
+
+	def fit_chars(self, max_width):
+		return max((max_width + self.fontspacing) // self.advance, 0)
+
+
+
+"""
+Builds a PFont from a JSON manifest describing one or more font sheets and their characters. See drawing/pfontatlas.py for the format of the manifest
+"""
+def load_font(manifest):
+	from drawing import pfontatlas
+	atlas = pfontatlas.load_manifest(manifest)
+	return PFont(None, atlas.get_tilesize(), atlas = atlas)
 
 
 
@@ -921,45 +1530,171 @@ class PGraphicsContext:
 
 """
 Allows for saving a restoring the state of a PWindow. Should only be used within PWindow methods and not by users
+Also holds the last frame rendered for the state so that switching back to it can be presented immediately
 """
 class PWindowState:
 	def __init__(self, main_panel, actions):
 		self.main_panel = main_panel
 		self.actions = actions
+		self.frame = None
 
 	def get_main_panel(self):
 		return self.main_panel
 
 	def get_actions(self):
-		return self. actions
+		return self.actions
+
+	def get_frame(self):
+		return self.frame
+
+	def set_frame(self, frame):
+		self.frame = frame
+
+
+
+"""
+Handle returned by PWindow.call_later() and PWindow.call_every(). Cancelling it stops its action from being executed again
+"""
+class PTimer:
+	def __init__(self, action, interval, repeat):
+		self.action = action
+		self.interval = interval
+		self.repeat = repeat
+		self.cancelled = False
+
+	def cancel(self):
+		self.cancelled = True
+
+	def is_cancelled(self):
+		return self.cancelled
+
+
+
+"""
+Handle returned by PWindow.add_task() for a generator that does long-running work a piece at a time, yielding between pieces
+Cancelling it stops the generator from being resumed again
+"""
+class PTask:
+	def __init__(self, generator, priority):
+		self.generator = generator
+		self.priority = priority
+		self.done = False
+		self.cancelled = False
+
+	def cancel(self):
+		self.cancelled = True
+
+	def is_cancelled(self):
+		return self.cancelled
+
+	def is_done(self):
+		return self.done
 
 
 
 """
 PWindow wrapper for pygame window containing a PPanel which can have other PComponents added to it. Executes 0 or more functions on each iteration of the event loop
 Start the application with start()
+Keeps the cached frames of at most max_warm_states PWindowStates, discarding the least recently used frame when the limit is exceeded
+Switching to a PWindowState with a cached frame presents that frame on the current iteration in place of rendering the PComponents, which are rendered again from the next iteration
+A cached frame only saves the render of the first frame after switching. warm_state() runs as a task that lays out the PWindowState and renders its frame as two separate pieces, so that they are spread across iterations once the task budget is used up
+Timed actions are kept in a heap ordered by due time, so each iteration only pays for the timers that are due. Timers scheduled by a timed action are only added once the due timers have run, so they are never executed before the next iteration
+Tasks are resumed in priority order on each iteration until the task budget (in milliseconds) has been used up, so long jobs are spread across frames
+If resizable is True the window can be resized. Resize events are debounced, so the actions added with add_resize_action() and the relayout of the PComponents run at most once per iteration
+Only the display subsystem (which includes events) is initialised. Call pygame.init() yourself if you need audio, joysticks or other subsystems
 """
 class PWindow:
-	def __init__(self, width, height, orientation = VERTICAL_ORIENTATION):
+	def __init__(self, width, height, orientation = VERTICAL_ORIENTATION, max_warm_states = 4, resizable = False):
 		self.width = width
 		self.height = height
-		pygame.init()
+		self.orientation = orientation
+		self.flags = 0
+		if resizable:
+			self.flags = pygame.RESIZABLE
+		pygame.display.init()
 		self.clock = pygame.time.Clock()
-		self.screen = pygame.display.set_mode((width, height))
+		self.screen = pygame.display.set_mode((width, height), self.flags)
+		self.resize_actions = []
+		self.pending_size = None
 		self.focus = None
 		self.main_panel = PPanel(orientation, "Main Panel")
 		self.actions = []
+		self.coalesced_actions = []
+		self.state = PWindowState(self.main_panel, self.actions)
+		self.max_warm_states = max_warm_states
+		self.warm_states = collections.OrderedDict()
+		self.event_source = pygame.event.get
+		self.event_hooks = []
+		self.frame_hooks = []
+		self.timers = []
+		self.timer_count = 0
+		self.new_timers = None
+		self.tasks = []
+		self.task_count = 0
+		self.task_budget = 8
+		self.frame = 0
+		self.frame_ready = False
+		self.running = False
 
 	def get_state(self):
-		return PWindowState(self.main_panel, self.actions)
+		return self.state
 
 	def reset_state(self):
-		self.main_panel = PPanel(orientation, "Main Panel")
+		self.main_panel = PPanel(self.orientation, "Main Panel")
 		self.actions = []
+		self.state = PWindowState(self.main_panel, self.actions)
+		self.reset_focus()
 
 	def set_state(self, pwindowstate):
+		if pwindowstate is self.state:
+			return
+		old_frame = self.state.get_frame()
+		if old_frame != None and old_frame.get_size() == self.screen.get_size():
+			old_frame.blit(self.screen, (0, 0))
+		else:
+			old_frame = self.screen.copy()
+		self.cache_frame(self.state, old_frame)
+		self.state = pwindowstate
 		self.main_panel = pwindowstate.get_main_panel()
 		self.actions = pwindowstate.get_actions()
+		self.reset_focus()
+		frame = pwindowstate.get_frame()
+		if frame != None:
+			self.touch_state(pwindowstate)
+			self.screen.blit(frame, (0, 0))
+			self.frame_ready = True
+
+	def warm_state(self, pwindowstate, priority = 0):
+		return self.add_task(self.warm_state_steps(pwindowstate), priority)
+
+	def warm_state_steps(self, pwindowstate):
+		pwindowstate.get_main_panel().adjust_children()
+		yield
+		if pwindowstate is self.state:
+			return
+		frame = pygame.Surface((self.width, self.height)).convert()
+		focus = self.focus
+		self.focus = None
+		self.render(frame, pwindowstate.get_main_panel())
+		self.focus = focus
+		self.cache_frame(pwindowstate, frame)
+
+	def cache_frame(self, pwindowstate, frame):
+		pwindowstate.set_frame(frame)
+		self.touch_state(pwindowstate)
+		while len(self.warm_states) > self.max_warm_states:
+			oldest, _ = self.warm_states.popitem(last = False)
+			oldest.set_frame(None)
+
+	def touch_state(self, pwindowstate):
+		self.warm_states.pop(pwindowstate, None)
+		self.warm_states[pwindowstate] = True
+
+	def render(self, surface, main_panel = None):
+		if main_panel == None:
+			main_panel = self.main_panel
+		surface.fill((255, 255, 255))
+		main_panel.paint(surface, self)
 
 	def add_component(self, comp):
 		self.main_panel.add_component(comp)
@@ -967,6 +1702,108 @@ class PWindow:
 	def add_action(self, action):
 		self.actions.append(action)
 
+	def add_resize_action(self, action):
+		self.resize_actions.append(action)
+
+	def get_width(self):
+		return self.width
+
+	def get_height(self):
+		return self.height
+
+	def resize(self, width, height):
+		self.width = width
+		self.height = height
+		if self.screen.get_size() != (width, height):
+			self.screen = pygame.display.set_mode((width, height), self.flags)
+		for pwindowstate in self.warm_states:
+			pwindowstate.set_frame(None)
+		self.warm_states.clear()
+		self.frame_ready = False
+		for action in self.resize_actions:
+			action(self)
+		self.relayout()
+
+	def relayout(self):
+		fit_tree(self.main_panel)
+		self.main_panel.adjust_children()
+
+	def coalesce_action(self, action):
+		if action not in self.coalesced_actions:
+			self.coalesced_actions.append(action)
+
+	def call_later(self, delay, action):
+		return self.schedule(PTimer(action, delay, False), delay)
+
+	def call_every(self, interval, action):
+		return self.schedule(PTimer(action, interval, True), interval)
+
+	def schedule(self, timer, delay):
+		self.timer_count += 1
+		entry = (get_time() + delay, self.timer_count, timer)
+		if self.new_timers != None:
+			self.new_timers.append(entry)
+		else:
+			heapq.heappush(self.timers, entry)
+		return timer
+
+	def run_timers(self):
+		now = get_time()
+		self.new_timers = []
+		try:
+			while len(self.timers) != 0 and self.timers[0][0] <= now:
+				due, count, timer = heapq.heappop(self.timers)
+				if timer.is_cancelled():
+					continue
+				if timer.repeat:
+					due += timer.interval
+					if due <= now:
+						due = now + timer.interval
+					self.new_timers.append((due, count, timer))
+				timer.action(self)
+		finally:
+			new_timers = self.new_timers
+			self.new_timers = None
+			for entry in new_timers:
+				heapq.heappush(self.timers, entry)
+
+	def add_task(self, generator, priority = 0):
+		task = PTask(generator, priority)
+		self.push_task(task)
+		return task
+
+	def push_task(self, task):
+		self.task_count += 1
+		heapq.heappush(self.tasks, (-task.priority, self.task_count, task))
+
+	def set_task_budget(self, budget):
+		self.task_budget = budget
+
+	def get_task_budget(self):
+		return self.task_budget
+
+	def run_tasks(self):
+		deadline = get_time() + self.task_budget
+		while len(self.tasks) != 0 and get_time() < deadline:
+			priority, count, task = heapq.heappop(self.tasks)
+			if task.is_cancelled():
+				continue
+			try:
+				next(task.generator)
+			except StopIteration:
+				task.done = True
+				continue
+			self.push_task(task)
+
+	def get_idle_time(self):
+		if len(self.tasks) != 0:
+			return 0
+		while len(self.timers) != 0 and self.timers[0][2].is_cancelled():
+			heapq.heappop(self.timers)
+		if len(self.timers) == 0:
+			return None
+		return max(self.timers[0][0] - get_time(), 0)
+
 	def set_focus(self, comp):
 		self.focus = comp
 
@@ -976,28 +1813,97 @@ class PWindow:
 	def get_focus(self):
 		return self.focus
 
+	def set_event_source(self, source):
+		self.event_source = source
+
+	def add_event_hook(self, hook):
+		self.event_hooks.append(hook)
+
+	def add_frame_hook(self, hook):
+		self.frame_hooks.append(hook)
+
+	def get_frame(self):
+		return self.frame
+
 	def start(self, fps):
-		while (True):
+		self.running = True
+		while self.running:
 			self.clock.tick(fps)
-			for event in pygame.event.get():
-				if event.type == pygame.locals.QUIT:
-					pygame.quit()
-				if event.type == pygame.MOUSEBUTTONDOWN:
-					x, y = event.pos
-					self.main_panel.mouse_down(x, y, self)
-				if event.type == pygame.MOUSEBUTTONUP:
-					x, y = event.pos
-					self.main_panel.mouse_up(x, y, self)
-					if self.focus != None:
-						self.focus.mouse_up(x, y, self)
-				if event.type == pygame.KEYDOWN:
-					if self.focus != None:
-						self.focus.key_down(event.key, self)
-				if event.type == pygame.KEYUP:
-					if self.focus != None:
-						self.focus.key_up(event.key, self)
-			for action in self.actions:
-				action(self)
-			self.screen.fill((255, 255, 255))
-			self.main_panel.paint(self.screen, self)
-			pygame.display.update()
\ No newline at end of file
+			self.step()
+		pygame.quit()
+
+	def stop(self):
+		self.running = False
+
+	def step(self):
+		for event in self.event_source():
+			for hook in self.event_hooks:
+				hook(event, self)
+			self.handle_event(event)
+		if self.pending_size != None:
+			width, height = self.pending_size
+			self.pending_size = None
+			self.resize(width, height)
+		self.run_timers()
+		coalesced_actions = self.coalesced_actions
+		self.coalesced_actions = []
+		for action in coalesced_actions:
+			action(self)
+		for action in self.actions:
+			action(self)
+		self.run_tasks()
+		if self.frame_ready:
+			self.frame_ready = False
+		else:
+			self.render(self.screen)
+		pygame.display.update()
+		for hook in self.frame_hooks:
+			hook(self)
+		self.frame += 1
+
+	def handle_event(self, event):
+		if event.type == pygame.QUIT:
+			self.stop()
+		if event.type == pygame.VIDEORESIZE:
+			self.pending_size = event.size
+		if event.type == pygame.MOUSEBUTTONDOWN:
+			x, y = event.pos
+			self.main_panel.mouse_down(x, y, self)
+		if event.type == pygame.MOUSEBUTTONUP:
+			x, y = event.pos
+			self.main_panel.mouse_up(x, y, self)
+			if self.focus != None:
+				self.focus.mouse_up(x, y, self)
+		if event.type == pygame.MOUSEMOTION:
+			if self.focus != None:
+				x, y = event.pos
+				self.focus.mouse_motion(x, y, self)
+		if event.type == pygame.KEYDOWN:
+			if self.focus != None:
+				self.focus.key_down(event.key, self)
+		if event.type == pygame.KEYUP:
+			if self.focus != None:
+				self.focus.key_up(event.key, self)
+
+
+"""
+Fits the size of each PComponent in the tree under component to its sub-PComponents, from the bottom up
+"""
+def fit_tree(component):
+	for comp in component.components:
+		fit_tree(comp)
+	component.fit_components()
+
+"""
+Returns the current time in milliseconds, used for timing PWindow actions
+Uses pygame's monotonic tick count, so timers aren't disturbed by changes to the system clock. The tick count is started by the PWindow's pygame.time.Clock
+"""
+def get_time():
+	return pygame.time.get_ticks()
+
+"""
+Returns a monotonic time in seconds with sub-millisecond resolution, used for measuring how long frames and events take
+Falls back to time.time() on Pythons without time.perf_counter
+"""
+def get_precise_time():
+	return getattr(time, "perf_counter", time.time)()
@@ -0,0 +1,122 @@
+import json
+import math
+
+import pygame
+
+import pgui
+
+"""
+Histogram of latencies in microseconds, in the style of HdrHistogram
+Values are counted in buckets whose width grows with the size of the values, so each recorded value is accurate to within 1 part in 2 ** significant_bits
+"""
+class PLatencyHistogram:
+	def __init__(self, significant_bits = 5):
+		self.significant_bits = significant_bits
+		self.counts = {}
+		self.count = 0
+		self.total = 0
+		self.minimum = None
+		self.maximum = 0
+
+	def record(self, value):
+		value = max(int(value), 0)
+		shift = max(value.bit_length() - self.significant_bits, 0)
+		low = (value >> shift) << shift
+		self.counts[low] = self.counts.get(low, 0) + 1
+		self.count += 1
+		self.total += value
+		if self.minimum == None or value < self.minimum:
+			self.minimum = value
+		self.maximum = max(self.maximum, value)
+
+	def get_bucket_width(self, low):
+		return 1 << max(low.bit_length() - self.significant_bits, 0)
+
+	def percentile(self, percent):
+		if self.count == 0:
+			return 0
+		target = max(int(math.ceil(self.count * percent / 100.0)), 1)
+		seen = 0
+		for low in sorted(self.counts):
+			seen += self.counts[low]
+			if seen >= target:
+				return min(low + self.get_bucket_width(low) - 1, self.maximum)
+		return self.maximum
+
+	def get_count(self):
+		return self.count
+
+	def get_mean(self):
+		if self.count == 0:
+			return 0
+		return float(self.total) / self.count
+
+	def to_dict(self):
+		return {
+			"count": self.count,
+			"min_us": self.minimum,
+			"max_us": self.maximum,
+			"mean_us": self.get_mean(),
+			"p50_us": self.percentile(50),
+			"p90_us": self.percentile(90),
+			"p99_us": self.percentile(99),
+			"p99.9_us": self.percentile(99.9),
+			"buckets": [[low, self.counts[low]] for low in sorted(self.counts)]
+		}
+
+
+"""
+Measures the time from each event being dequeued by a PWindow to the pygame.display.update() that first shows its effects
+Latencies are kept in a PLatencyHistogram for each type of event and for each PComponent targeted by events
+Mouse events target the innermost PComponent under the mouse, other events target the PWindow's focus
+"""
+class PLatencyMonitor:
+	def __init__(self, significant_bits = 5):
+		self.significant_bits = significant_bits
+		self.event_types = {}
+		self.components = {}
+		self.pending = []
+
+	def attach(self, window):
+		window.add_event_hook(self.event_dequeued)
+		window.add_frame_hook(self.frame_presented)
+
+	def event_dequeued(self, event, window):
+		now = pgui.get_precise_time()
+		if hasattr(event, "pos"):
+			target = window.main_panel.get_component_at(event.pos[0], event.pos[1])
+		else:
+			target = window.get_focus()
+		self.pending.append((now, pygame.event.event_name(event.type), target))
+
+	def frame_presented(self, window):
+		now = pgui.get_precise_time()
+		for dequeued, event_type, target in self.pending:
+			latency = (now - dequeued) * 1000000
+			self.get_histogram(self.event_types, event_type).record(latency)
+			if target != None:
+				self.get_histogram(self.components, target.__class__.__name__ + ":" + target.debug_name).record(latency)
+		self.pending = []
+
+	def get_histogram(self, histograms, name):
+		histogram = histograms.get(name)
+		if histogram == None:
+			histogram = PLatencyHistogram(self.significant_bits)
+			histograms[name] = histogram
+		return histogram
+
+	def get_event_type_histograms(self):
+		return self.event_types
+
+	def get_component_histograms(self):
+		return self.components
+
+	def to_dict(self):
+		return {
+			"event_types": dict((name, histogram.to_dict()) for name, histogram in self.event_types.items()),
+			"components": dict((name, histogram.to_dict()) for name, histogram in self.components.items())
+		}
+
+	def export(self, filename):
+		with open(filename, "w") as jsonfile:
+			json.dump(self.to_dict(), jsonfile, indent = 1, sort_keys = True)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+
+import pgui
+
+REQUIRED = object()
+CACHE_VERSION = 2
+ORIENTATIONS = {"vertical": pgui.VERTICAL_ORIENTATION, "horizontal": pgui.HORIZONTAL_ORIENTATION}
+
+"""
+The constructor of each PComponent type that can appear in a definition
+Each entry is (class, takes a PGraphicsContext, [(key, default), ...]), listing the keys passed to the constructor in order
+"""
+COMPONENT_TYPES = {
+	"PPanel": (pgui.PPanel, False, [("orientation", "vertical")]),
+	"PGridPanel": (pgui.PGridPanel, False, [("rows", REQUIRED), ("columns", REQUIRED), ("width", 0), ("height", 0)]),
+	"PScrollPanel": (pgui.PScrollPanel, True, [("max_width", REQUIRED), ("max_height", REQUIRED), ("orientation", "vertical")]),
+	"PLabel": (pgui.PLabel, True, [("value", "")]),
+	"PParagraph": (pgui.PParagraph, True, [("value", ""), ("max_width", REQUIRED)]),
+	"PImage": (pgui.PImage, True, [("filename", REQUIRED), ("width", REQUIRED), ("height", REQUIRED)]),
+	"PVerticalStrut": (pgui.PVerticalStrut, False, [("height", REQUIRED)]),
+	"PHorizontalStrut": (pgui.PHorizontalStrut, False, [("width", REQUIRED)]),
+	"PButton": (pgui.PButton, True, [("value", "")]),
+	"PCheckBox": (pgui.PCheckBox, True, [("label", "")]),
+	"PSelector": (pgui.PSelector, True, [("width", REQUIRED), ("rows", REQUIRED)]),
+	"PVerticalScrollWheel": (pgui.PVerticalScrollWheel, True, [("maximum", REQUIRED)]),
+	"PHorizontalScrollWheel": (pgui.PHorizontalScrollWheel, True, [("maximum", REQUIRED)]),
+	"PVerticalScrollBar": (pgui.PVerticalScrollBar, True, [("maximum", REQUIRED)]),
+	"PHorizontalScrollBar": (pgui.PHorizontalScrollBar, True, [("maximum", REQUIRED)]),
+	"PTextBox": (pgui.PTextBox, True, [("max_width", REQUIRED), ("maxlength", 10000)]),
+	"PLogView": (pgui.PLogView, True, [("filename", REQUIRED), ("width", REQUIRED), ("rows", REQUIRED), ("follow", False)])
+}
+
+
+"""
+Builds PComponent trees from declarative JSON definitions such as:
+{"type": "PPanel", "orientation": "vertical", "children": [{"type": "PLabel", "value": "name"}, {"type": "PButton", "value": "ok", "action": "submit"}]}
+Each node names its type and the arguments of its constructor. "name" sets the debug_name, "children" lists the PComponents of a PPanel, PGridPanel or PScrollPanel, and children of a PGridPanel give their "row" and "column"
+"action" (or a list of "actions") names functions in actions that are added to the PComponent, and "options" lists the options of a PSelector
+Each container is fitted to its children once they have all been built, and the whole tree is laid out in a single pass at the end
+The geometry of every PComponent is cached in a file keyed by the hash of the definition, CACHE_VERSION and the metrics of the PFont. When the cache matches, the cached geometry is applied instead of laying out the tree again
+Every PComponent is still constructed, measuring its text, and each container is still fitted as it is built, so the cache only saves the final layout pass
+Bump CACHE_VERSION whenever a change to the layout code would place PComponents differently, so that old caches are ignored
+"""
+class PLoader:
+	def __init__(self, gc, actions = None, cache_dir = None):
+		self.gc = gc
+		if actions == None:
+			actions = {}
+		self.actions = actions
+		self.cache_dir = cache_dir
+		self.warm = False
+
+	def load(self, filename):
+		with open(filename) as definitionfile:
+			definition = json.load(definitionfile)
+		cache_file = filename + ".cache"
+		if self.cache_dir != None:
+			cache_file = os.path.join(self.cache_dir, os.path.basename(filename) + ".cache")
+		return self.load_definition(definition, cache_file)
+
+	def load_definition(self, definition, cache_file = None):
+		font = self.gc.font
+		key = hashlib.sha1((json.dumps(definition, sort_keys = True) + repr((CACHE_VERSION, font.get_fontsize(), font.get_fontspacing(), font.get_advance()))).encode("utf-8")).hexdigest()
+		cache = None
+		if cache_file != None:
+			cache = read_cache(cache_file, key)
+
+		self.warm = cache != None
+		root = self.build(definition)
+		components = list(walk(root))
+		if self.warm and len(components) == len(cache["geometry"]):
+			for component, (x, y, width, height) in zip(components, cache["geometry"]):
+				component.set_x(x)
+				component.set_y(y)
+				component.set_width(width)
+				component.set_height(height)
+		else:
+			self.warm = False
+			root.adjust_children()
+			if cache_file != None:
+				write_cache(cache_file, key, components)
+		return root
+
+	def is_warm(self):
+		return self.warm
+
+	def build(self, node):
+		if node.get("type") not in COMPONENT_TYPES:
+			raise ValueError("Unknown component type: %r" % node.get("type"))
+		cls, takes_gc, parameters = COMPONENT_TYPES[node["type"]]
+		args = []
+		if takes_gc:
+			args.append(self.gc)
+		for name, default in parameters:
+			value = node.get(name, default)
+			if value is REQUIRED:
+				raise ValueError("%s is missing %r" % (node["type"], name))
+			if name == "orientation":
+				value = ORIENTATIONS[value]
+			args.append(value)
+		component = cls(*args, debug_name = node.get("name", "Anonymous"))
+
+		for option in node.get("options", []):
+			component.add_option(option)
+		names = node.get("actions", [])
+		if "action" in node:
+			names = [node["action"]] + names
+		for name in names:
+			if name not in self.actions:
+				raise ValueError("Unknown action: %r" % name)
+			component.add_action(self.actions[name])
+
+		children = node.get("children", [])
+		if len(children) != 0:
+			if isinstance(component, pgui.PGridPanel):
+				component.add_components([(self.build(child), child.get("row", 0), child.get("column", 0)) for child in children])
+			elif isinstance(component, pgui.PScrollPanel):
+				component.main_panel.add_components([self.build(child) for child in children])
+				if not self.warm:
+					component.main_panel.adjust_children()
+				component.update_viewport()
+			elif isinstance(component, pgui.PPanel):
+				component.add_components([self.build(child) for child in children])
+			else:
+				raise ValueError("%s can't have children" % node["type"])
+		return component
+
+
+"""
+Yields component and every PComponent under it, including the inner PPanel and scroll bars of each PScrollPanel, in the order their geometry is cached
+"""
+def walk(component):
+	yield component
+	children = component.components
+	if isinstance(component, pgui.PScrollPanel):
+		yield component.main_panel
+		yield component.vertical_scroll
+		yield component.horizontal_scroll
+		children = component.main_panel.components
+	for comp in children:
+		for descendant in walk(comp):
+			yield descendant
+
+"""
+Returns the contents of the cache file if it exists and was written for key, otherwise None
+"""
+def read_cache(cache_file, key):
+	try:
+		with open(cache_file) as cachefile:
+			cache = json.load(cachefile)
+	except (IOError, OSError, ValueError):
+		return None
+	if cache.get("key") != key:
+		return None
+	return cache
+
+"""
+Writes the geometry of components to the cache file. Failing to write the cache doesn't stop the tree from being loaded
+"""
+def write_cache(cache_file, key, components):
+	cache = {
+		"key": key,
+		"geometry": [[comp.get_x(), comp.get_y(), comp.get_width(), comp.get_height()] for comp in components]
+	}
+	try:
+		with open(cache_file, "w") as cachefile:
+			json.dump(cache, cachefile)
+	except (IOError, OSError):
+		pass
+
+"""
+Builds the PComponent tree described by the JSON definition in filename. See PLoader for the format of the definition
+"""
+def load(gc, filename, actions = None, cache_dir = None):
+	return PLoader(gc, actions, cache_dir).load(filename)
@@ -0,0 +1,129 @@
+import struct
+
+import pygame
+
+import pgui
+
+"""
+Each recorded event is stored as: frame, seconds since the first recorded event, event type, x, y, key, button
+The new size of a resize event is stored in x and y
+"""
+EVENT_FORMAT = struct.Struct("<IdHhhiB")
+MOUSE_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION)
+BUTTON_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+KEY_EVENTS = (pygame.KEYDOWN, pygame.KEYUP)
+RESIZE_EVENTS = (pygame.VIDEORESIZE,)
+
+
+"""
+Records every event a PWindow dequeues to a compact binary file
+Attach it to a PWindow before calling start() and close it once the PWindow has stopped
+"""
+class PEventRecorder:
+	def __init__(self, filename):
+		self.file = open(filename, "wb")
+		self.start_time = None
+		self.start_frame = None
+
+	def attach(self, window):
+		window.add_event_hook(self.record)
+
+	def record(self, event, window):
+		now = pgui.get_precise_time()
+		if self.start_time == None:
+			self.start_time = now
+			self.start_frame = window.get_frame()
+		x, y = getattr(event, "pos", getattr(event, "size", (0, 0)))
+		self.file.write(EVENT_FORMAT.pack(window.get_frame() - self.start_frame, now - self.start_time, event.type, x, y, getattr(event, "key", 0), getattr(event, "button", 0)))
+
+	def close(self):
+		self.file.close()
+
+
+"""
+Feeds the events recorded by a PEventRecorder into a PWindow, replacing its live event source
+If realtime is True, events are delivered at the times they were recorded, otherwise each recorded frame is delivered on its own frame as fast as the PWindow can run
+Stops the PWindow once every event has been delivered if stop_at_end is True
+The time taken by each frame of the replay, from the PWindow asking for its events to the pygame.display.update() that ends it, is collected and can be read with get_frame_times() or get_summary()
+The time the PWindow spends waiting in clock.tick() between frames isn't counted. To replay as fast as possible, start the PWindow with start(0) so that the frame rate isn't capped
+"""
+class PEventReplayer:
+	def __init__(self, filename, realtime = False, stop_at_end = True):
+		self.realtime = realtime
+		self.stop_at_end = stop_at_end
+		self.records = []
+		with open(filename, "rb") as eventfile:
+			data = eventfile.read()
+		for offset in range(0, len(data) - EVENT_FORMAT.size + 1, EVENT_FORMAT.size):
+			self.records.append(EVENT_FORMAT.unpack_from(data, offset))
+		self.index = 0
+		self.replay_frame = 0
+		self.start_time = None
+		self.step_start = None
+		self.frame_times = []
+		self.window = None
+
+	def attach(self, window):
+		self.window = window
+		window.set_event_source(self.get_events)
+		window.add_frame_hook(self.frame_presented)
+
+	def get_events(self):
+		now = pgui.get_precise_time()
+		if self.start_time == None:
+			self.start_time = now
+		self.step_start = now
+		pygame.event.pump()
+		events = []
+		while self.index < len(self.records):
+			frame, timestamp, event_type, x, y, key, button = self.records[self.index]
+			if self.realtime and timestamp > now - self.start_time:
+				break
+			if not self.realtime and frame > self.replay_frame:
+				break
+			events.append(make_event(event_type, x, y, key, button))
+			self.index += 1
+		self.replay_frame += 1
+		if self.index >= len(self.records) and self.stop_at_end:
+			self.window.stop()
+		return events
+
+	def frame_presented(self, window):
+		if self.step_start != None:
+			self.frame_times.append(pgui.get_precise_time() - self.step_start)
+			self.step_start = None
+
+	def get_frame_times(self):
+		return self.frame_times
+
+	def get_summary(self):
+		times = sorted(self.frame_times)
+		if len(times) == 0:
+			return {"frames": 0}
+		return {
+			"frames": len(times),
+			"total_ms": sum(times) * 1000,
+			"mean_ms": sum(times) * 1000 / len(times),
+			"p50_ms": times[len(times) * 50 // 100] * 1000,
+			"p95_ms": times[min(len(times) * 95 // 100, len(times) - 1)] * 1000,
+			"p99_ms": times[min(len(times) * 99 // 100, len(times) - 1)] * 1000,
+			"max_ms": times[-1] * 1000
+		}
+
+
+"""
+Rebuilds a pygame event from the fields stored by a PEventRecorder
+"""
+def make_event(event_type, x, y, key, button):
+	attributes = {}
+	if event_type in MOUSE_EVENTS:
+		attributes["pos"] = (x, y)
+	if event_type in BUTTON_EVENTS:
+		attributes["button"] = button
+	if event_type in KEY_EVENTS:
+		attributes["key"] = key
+	if event_type in RESIZE_EVENTS:
+		attributes["size"] = (x, y)
+		attributes["w"] = x
+		attributes["h"] = y
+	return pygame.event.Event(event_type, attributes)